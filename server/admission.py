@@ -0,0 +1,153 @@
+import asyncio
+import math
+import sqlite3
+import threading
+import time
+from typing import Dict
+from fastapi import HTTPException
+
+# In-process buckets kept before the least recently used are evicted
+RATE_LIMIT_MAX_KEYS = 10000
+# SQLite acquisitions between sweeps of idle rows
+RATE_LIMIT_PRUNE_EVERY = 1000
+
+class TokenBucketLimiter:
+    """In-process per-key token bucket refilling `rate` tokens per second up to `capacity`"""
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.buckets: Dict[str, tuple] = {}
+
+    @property
+    def idle_seconds(self) -> float:
+        """Time after which an untouched bucket has refilled completely and can be forgotten"""
+        return self.capacity / self.rate
+
+    def take(self, tokens: float, last: float, now: float) -> tuple:
+        """Refill a bucket and try to take one token, returning the new level and seconds to wait"""
+        tokens = min(self.capacity, tokens + max(0.0, now - last) * self.rate)
+        if tokens < 1:
+            return tokens, (1 - tokens) / self.rate
+        return tokens - 1, 0.0
+
+    def acquire(self, key: str) -> float:
+        now = time.monotonic()
+        # Re-insert the key so the dict stays ordered from least to most recently used
+        tokens, last = self.buckets.pop(key, (self.capacity, now))
+        tokens, wait = self.take(tokens, last, now)
+        self.buckets[key] = (tokens, now)
+
+        # Trim from the least recently used end: buckets that have refilled completely, and any
+        # beyond RATE_LIMIT_MAX_KEYS, so a flood of new keys costs O(1) per request
+        while len(self.buckets) > 1:
+            oldest = next(iter(self.buckets))
+            if len(self.buckets) <= RATE_LIMIT_MAX_KEYS and now - self.buckets[oldest][1] < self.idle_seconds:
+                break
+            del self.buckets[oldest]
+        return wait
+
+    async def acquire_async(self, key: str) -> float:
+        return self.acquire(key)
+
+class SQLiteTokenBucketLimiter(TokenBucketLimiter):
+    """Token bucket whose state lives in a local SQLite file shared by all workers on the host"""
+    def __init__(self, rate: float, capacity: int, path: str, name: str):
+        super().__init__(rate, capacity)
+        self.name = name
+        self.lock = threading.Lock()
+        self.acquisitions = 0
+        self.conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits "
+            "(bucket TEXT, key TEXT, tokens REAL, updated REAL, PRIMARY KEY (bucket, key))"
+        )
+
+    def acquire(self, key: str) -> float:
+        now = time.time()
+        with self.lock:
+            self.acquisitions += 1
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute(
+                    "SELECT tokens, updated FROM rate_limits WHERE bucket = ? AND key = ?",
+                    (self.name, key)
+                ).fetchone()
+                tokens, last = row if row else (self.capacity, now)
+                tokens, wait = self.take(tokens, last, now)
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO rate_limits VALUES (?, ?, ?, ?)",
+                    (self.name, key, tokens, now)
+                )
+                if self.acquisitions % RATE_LIMIT_PRUNE_EVERY == 0:
+                    # Drop rows idle long enough to have refilled completely
+                    self.conn.execute(
+                        "DELETE FROM rate_limits WHERE bucket = ? AND updated < ?",
+                        (self.name, now - self.idle_seconds)
+                    )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    async def acquire_async(self, key: str) -> float:
+        # Waiting on the SQLite lock held by another worker must not stall the event loop
+        return await asyncio.to_thread(self.acquire, key)
+
+def make_rate_limiter(name: str, rate: float, capacity: int, db_path: str = None) -> TokenBucketLimiter:
+    if db_path:
+        return SQLiteTokenBucketLimiter(rate, capacity, db_path, name)
+    return TokenBucketLimiter(rate, capacity)
+
+async def enforce_rate_limit(limiter: TokenBucketLimiter, key: str):
+    try:
+        wait = await limiter.acquire_async(key)
+    except sqlite3.OperationalError:
+        # The shared SQLite file stayed locked past its timeout, shed the request rather than fail open
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, please retry shortly",
+            headers={"Retry-After": "1"}
+        )
+    if wait > 0:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests, please slow down",
+            headers={"Retry-After": str(math.ceil(wait))}
+        )
+
+class ConcurrencyLimiter:
+    """Dependency capping in-flight requests on a route, queueing a bounded number and shedding the rest"""
+    def __init__(self, limit: int, max_queue: int, queue_timeout: float):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.waiting = 0
+
+    def overloaded(self) -> HTTPException:
+        return HTTPException(
+            status_code=503,
+            detail="Server is busy, please retry shortly",
+            headers={"Retry-After": str(math.ceil(self.queue_timeout))}
+        )
+
+    def saturated(self) -> bool:
+        """Whether a new request would be shed because every slot and queue position is taken"""
+        return self.semaphore.locked() and self.waiting >= self.max_queue
+
+    async def __call__(self):
+        if self.saturated():
+            raise self.overloaded()
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise self.overloaded()
+        finally:
+            self.waiting -= 1
+
+        try:
+            yield
+        finally:
+            self.semaphore.release()
@@ -0,0 +1,103 @@
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Questions per tally shard document, each adds 3 increments per submission so a shard
+# stays under Firestore's 500 field transforms per document in one commit
+ANALYTICS_SHARD_SIZE = 100
+# Counter slots per form, submissions pick one at random so a class submitting together
+# spreads its writes instead of contending on a single document
+ANALYTICS_COUNTER_SLOTS = 20
+
+def answer_option_key(question: dict, answer: Optional[str]) -> str:
+    """Tally key for an answer: the chosen option's index, 'unanswered' for blanks or 'other'"""
+    if answer is None or answer == "":
+        return "unanswered"
+    if answer in question['options']:
+        return str(question['options'].index(answer))
+    return "other"
+
+def submission_tallies(questions: List[dict], answers: Dict[str, str], total_marks: float) -> Tuple[dict, dict]:
+    """Counts one graded submission adds: form totals, and a tally per question keyed by its index"""
+    totals = {"submissions": 1, "total_marks": total_marks, "total_marks_sq": total_marks ** 2}
+    per_question = {}
+    for idx, question in enumerate(questions):
+        answer = answers.get(str(idx))
+        is_correct = answer == question['correct_answer']
+        per_question[str(idx)] = {
+            "options": {answer_option_key(question, answer): 1},
+            "correct": int(is_correct),
+            "correct_total_marks": total_marks if is_correct else 0
+        }
+    return totals, per_question
+
+def add_counts(target: dict, counts: dict) -> dict:
+    """Add nested numeric counts into target in place"""
+    for key, value in counts.items():
+        if isinstance(value, dict):
+            add_counts(target.setdefault(key, {}), value)
+        else:
+            target[key] = target.get(key, 0) + value
+    return target
+
+def tally_submissions(questions: List[dict], submissions: Iterable[dict]) -> Tuple[dict, dict]:
+    """Recount totals and per-question tallies from stored submissions"""
+    totals = {"submissions": 0, "total_marks": 0.0, "total_marks_sq": 0.0}
+    per_question = {}
+    for sub in submissions:
+        sub_totals, sub_questions = submission_tallies(
+            questions, sub.get("answers", {}), sub.get("total_marks", 0)
+        )
+        add_counts(totals, sub_totals)
+        add_counts(per_question, sub_questions)
+    return totals, per_question
+
+def analytics_shard_count(questions: List[dict]) -> int:
+    return math.ceil(len(questions) / ANALYTICS_SHARD_SIZE)
+
+def split_by_shard(per_question: dict) -> Dict[int, dict]:
+    """Group per-question tallies by the shard document that stores them"""
+    shards = {}
+    for key, tally in per_question.items():
+        shards.setdefault(int(key) // ANALYTICS_SHARD_SIZE, {})[key] = tally
+    return shards
+
+def summarize_analytics(questions: List[dict], stats: dict) -> dict:
+    """Turn tallies into per-question difficulty, option distribution and discrimination index"""
+    n = stats.get("submissions", 0)
+    total = stats.get("total_marks", 0)
+    mean = total / n if n else 0
+    std = math.sqrt(max(stats.get("total_marks_sq", 0) / n - mean ** 2, 0)) if n else 0
+
+    summary = []
+    for idx, question in enumerate(questions):
+        tally = stats.get("questions", {}).get(str(idx), {})
+        counts = tally.get("options", {})
+        correct = tally.get("correct", 0)
+
+        # Point-biserial correlation between answering correctly and the total score
+        discrimination = None
+        if 0 < correct < n and std > 0:
+            correct_total = tally.get("correct_total_marks", 0)
+            mean_correct = correct_total / correct
+            mean_incorrect = (total - correct_total) / (n - correct)
+            p = correct / n
+            discrimination = round((mean_correct - mean_incorrect) / std * math.sqrt(p * (1 - p)), 4)
+
+        summary.append({
+            "question": question['question'],
+            "correct_answer": question['correct_answer'],
+            "difficulty": round(correct / n * 100, 2) if n else None,
+            "discrimination": discrimination,
+            "options": [
+                {"option": option, "count": counts.get(str(opt_idx), 0)}
+                for opt_idx, option in enumerate(question['options'])
+            ],
+            "unanswered": counts.get("unanswered", 0),
+            "other": counts.get("other", 0)
+        })
+
+    return {
+        "submissions": n,
+        "average_marks": round(mean, 2),
+        "questions": summary
+    }
@@ -0,0 +1,291 @@
+"""Tail latency of GET /form and POST /submit with and without a saturated /generate-quiz
+
+Runs the app in-process against stand-ins for Firestore, Firebase auth, pdfplumber and the
+Together client. The stand-ins block their calling thread the way the real clients do, so
+any blocking work left on the event loop shows up in the latencies.
+
+    cd server && python bench/bench_admission.py [--duration 10] [--unlimited]
+
+--unlimited lifts the /generate-quiz slot limit to compare against no admission control.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from unittest import mock
+
+import firebase_admin
+import httpx
+from firebase_admin import auth, credentials, firestore
+from google.cloud.firestore_v1.transforms import Increment
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIRESTORE_LATENCY = 0.01  # seconds per Firestore round trip
+PDF_SECONDS = 0.5
+LLM_SECONDS = 2.0
+
+class FakeSnapshot:
+    def __init__(self, ref, data):
+        self.reference = ref
+        self.id = ref.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self.exists else None
+
+def merge_into(target: dict, data: dict):
+    for key, value in data.items():
+        if isinstance(value, Increment):
+            target[key] = target.get(key, 0) + value.value
+        elif isinstance(value, dict):
+            merge_into(target.setdefault(key, {}), value)
+        else:
+            target[key] = value
+
+class FakeDocument:
+    def __init__(self, db, path):
+        self.db = db
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def collection(self, name):
+        return FakeCollection(self.db, f"{self.path}/{name}")
+
+    def get(self, transaction=None):
+        self.db.round_trip()
+        return self.db.snapshot(self)
+
+    def set(self, data, merge=False):
+        self.db.round_trip()
+        self.db.write(self, data, merge)
+
+    def update(self, data):
+        self.set(data, merge=True)
+
+    def delete(self):
+        self.db.round_trip()
+        self.db.remove(self)
+
+class FakeQuery:
+    def __init__(self, collection, filters=(), limit=None):
+        self.collection = collection
+        self.filters = filters
+        self._limit = limit
+
+    def where(self, *args, filter=None):
+        return FakeQuery(self.collection, self.filters + (filter,), self._limit)
+
+    def limit(self, count):
+        return FakeQuery(self.collection, self.filters, count)
+
+    def stream(self):
+        self.collection.db.round_trip()
+        matches = []
+        for ref, data in self.collection.db.children(self.collection.path):
+            if all(data.get(f.field_path) == f.value for f in self.filters):
+                matches.append(FakeSnapshot(ref, data))
+        return iter(matches[:self._limit])
+
+class FakeCollection(FakeQuery):
+    def __init__(self, db, path):
+        super().__init__(self)
+        self.db = db
+        self.path = path
+
+    def document(self, doc_id=None):
+        return FakeDocument(self.db, f"{self.path}/{doc_id or uuid.uuid4().hex}")
+
+class FakeBatch:
+    def __init__(self, db):
+        self.db = db
+        self.writes = []
+
+    def set(self, ref, data, merge=False):
+        self.writes.append((ref, data, merge))
+
+    def delete(self, ref):
+        self.writes.append((ref, None, False))
+
+    def commit(self):
+        self.db.round_trip()
+        for ref, data, merge in self.writes:
+            if data is None:
+                self.db.remove(ref)
+            else:
+                self.db.write(ref, data, merge)
+
+class FakeFirestore:
+    """In-memory Firestore client whose calls block for FIRESTORE_LATENCY like a real round trip"""
+    def __init__(self):
+        self.docs = {}
+        self.lock = threading.Lock()
+
+    def round_trip(self):
+        time.sleep(FIRESTORE_LATENCY)
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    def batch(self):
+        return FakeBatch(self)
+
+    def get_all(self, refs):
+        self.round_trip()
+        return [self.snapshot(ref) for ref in refs]
+
+    def snapshot(self, ref):
+        with self.lock:
+            return FakeSnapshot(ref, self.docs.get(ref.path))
+
+    def write(self, ref, data, merge):
+        with self.lock:
+            target = self.docs.setdefault(ref.path, {}) if merge else {}
+            merge_into(target, data)
+            self.docs[ref.path] = target
+
+    def remove(self, ref):
+        with self.lock:
+            self.docs.pop(ref.path, None)
+
+    def children(self, path):
+        with self.lock:
+            return [
+                (FakeDocument(self, doc_path), dict(data))
+                for doc_path, data in self.docs.items()
+                if doc_path.rsplit("/", 1)[0] == path
+            ]
+
+class FakeCompletions:
+    def create(self, model, messages):
+        time.sleep(LLM_SECONDS)
+        questions = ",".join(
+            f'{{"question": "Q{idx}", "options": ["a", "b", "c", "d"], "correct_answer": "a", "marks": 1}}'
+            for idx in range(10)
+        )
+        message = mock.Mock(content=f'{{"questions": [{questions}]}}')
+        return mock.Mock(choices=[mock.Mock(message=message)])
+
+class FakeTogether:
+    def __init__(self, api_key=None):
+        self.chat = mock.Mock(completions=FakeCompletions())
+
+def fake_pdf_bytes_to_text(contents: bytes) -> str:
+    time.sleep(PDF_SECONDS)
+    return "Benchmark document text"
+
+def load_app(unlimited: bool):
+    os.environ.setdefault("SNAPSHOT_DIR", tempfile.mkdtemp())
+    fake_db = FakeFirestore()
+    with mock.patch.object(credentials, "Certificate"), \
+            mock.patch.object(firebase_admin, "initialize_app"), \
+            mock.patch.object(firestore, "client", return_value=fake_db):
+        import main
+
+    auth.verify_id_token = lambda token: {"email": token}
+    main.Together = FakeTogether
+    main.pdf_bytes_to_text = fake_pdf_bytes_to_text
+    if unlimited:
+        main.generate_quiz_slots.semaphore = asyncio.Semaphore(10 ** 6)
+
+    main.get_form_ref("bench_form").set({
+        "form_name": "bench_form",
+        "questions": [
+            {"question": f"Q{idx}", "options": ["a", "b", "c", "d"], "correct_answer": "a", "marks": 1}
+            for idx in range(20)
+        ],
+        "protected": False,
+        "show_answers": True,
+        "creator_email": "creator@example.com"
+    })
+    return main.app
+
+async def worker(client, make_request, stop_at, latencies, statuses):
+    while time.monotonic() < stop_at:
+        start = time.monotonic()
+        response = await make_request(client)
+        latencies.append(time.monotonic() - start)
+        statuses[response.status_code] += 1
+        # Shed clients retry after Retry-After, capped at a second to keep the route saturated
+        if "retry-after" in response.headers:
+            await asyncio.sleep(min(int(response.headers["retry-after"]), 1))
+
+# Shared across scenarios so every submission is a student's first
+emails = itertools.count()
+
+async def run_scenario(app, duration: float, readers: int, submitters: int, creators: int) -> dict:
+    results = {name: ([], Counter()) for name in ("/form", "/submit", "/generate-quiz")}
+
+    async def get_form(client):
+        return await client.get("/form/bench_form")
+
+    async def submit(client):
+        return await client.post("/submit", json={
+            "form_name": "bench_form",
+            "user_name": "Bench",
+            "user_email": f"student{next(emails)}@example.com",
+            "answers": {str(idx): "a" for idx in range(20)}
+        })
+
+    def generate_quiz(creator: int):
+        async def request(client):
+            return await client.post(
+                "/generate-quiz",
+                headers={"Authorization": f"Bearer creator{creator}@example.com"},
+                data={"form_name": f"quiz_{uuid.uuid4().hex}"},
+                files={"file": ("notes.pdf", b"%PDF-1.4 benchmark", "application/pdf")}
+            )
+        return request
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        stop_at = time.monotonic() + duration
+        tasks = (
+            [worker(client, get_form, stop_at, *results["/form"]) for _ in range(readers)]
+            + [worker(client, submit, stop_at, *results["/submit"]) for _ in range(submitters)]
+            + [worker(client, generate_quiz(idx), stop_at, *results["/generate-quiz"]) for idx in range(creators)]
+        )
+        await asyncio.gather(*tasks)
+    return results
+
+def percentile(values, pct):
+    if len(values) < 2:
+        return values[0] if values else float("nan")
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+def report(title: str, results: dict):
+    print(f"\n{title}")
+    print(f"{'route':<16}{'requests':>10}{'p50 ms':>10}{'p99 ms':>10}  statuses")
+    for route, (latencies, statuses) in results.items():
+        if not latencies:
+            continue
+        print(
+            f"{route:<16}{len(latencies):>10}{percentile(latencies, 50) * 1000:>10.1f}"
+            f"{percentile(latencies, 99) * 1000:>10.1f}  {dict(sorted(statuses.items()))}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=10, help="seconds per scenario")
+    parser.add_argument("--readers", type=int, default=10, help="concurrent GET /form clients")
+    parser.add_argument("--submitters", type=int, default=10, help="concurrent POST /submit clients")
+    parser.add_argument("--creators", type=int, default=40, help="concurrent /generate-quiz clients when saturated")
+    parser.add_argument("--unlimited", action="store_true", help="lift the /generate-quiz slot limit")
+    args = parser.parse_args()
+
+    app = load_app(args.unlimited)
+    baseline = asyncio.run(run_scenario(app, args.duration, args.readers, args.submitters, 0))
+    saturated = asyncio.run(run_scenario(app, args.duration, args.readers, args.submitters, args.creators))
+    report("Baseline", baseline)
+    report(f"/generate-quiz saturated by {args.creators} creators", saturated)
+
+if __name__ == "__main__":
+    main()
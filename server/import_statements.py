@@ -1,4 +1,4 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Depends
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import pandas as pd
 from io import BytesIO
@@ -44,4 +44,15 @@ import pdfplumber
 from io import BytesIO
 from typing import Optional, Dict, List
 from together import Together
-import datetime as dt
\ No newline at end of file
+import datetime as dt
+import asyncio
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import random
+import logging
+import sqlite3
+import tempfile
+import time
+import uuid
+import orjson
@@ -1,15 +1,58 @@
 from import_statements import *
+from admission import ConcurrencyLimiter, make_rate_limiter, enforce_rate_limit
+from question_bank import Question, parse_uploaded_form, split_question_shards
+from analytics import (
+    ANALYTICS_COUNTER_SLOTS, add_counts, analytics_shard_count, split_by_shard,
+    submission_tallies, summarize_analytics, tally_submissions
+)
 from together import Together
 # uvicorn main:app --reload
+logger = logging.getLogger(__name__)
 # Initialize Firebase
 path_to_credentials = os.path.join(os.getcwd(), "dynamic-form-270-firebase-adminsdk-fbsvc-efae9b4231.json")
 cred = credentials.Certificate(path_to_credentials)
 firebase_admin.initialize_app(cred)
 db = firestore.client()
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    snapshot_lease = SQLiteLease(SNAPSHOT_LEASE_DB, "snapshot")
+    snapshot_task = asyncio.create_task(snapshot_loop(snapshot_lease))
+    yield
+    snapshot_task.cancel()
+    try:
+        await snapshot_task
+    except asyncio.CancelledError:
+        pass
+
+app = FastAPI(lifespan=lifespan)
 security = HTTPBearer()
 
+# Registered before CORSMiddleware so CORS headers are still added to the responses it sends
+@app.middleware("http")
+async def shed_generate_quiz_early(request: Request, call_next):
+    """Reject /generate-quiz uploads before FastAPI reads the multipart body
+
+    Dependencies only run after the whole body (up to MAX_FILE_SIZE) has been parsed, so
+    anonymous, oversized or shed requests are turned away here from their headers alone.
+    Token verification and the per-user rate limit still happen in the route's dependencies.
+    """
+    if request.method == "POST" and request.url.path == "/generate-quiz":
+        if "authorization" not in request.headers:
+            return JSONResponse(status_code=403, content={"detail": "Not authenticated"})
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > MAX_FILE_SIZE:
+            return JSONResponse(status_code=413, content={"detail": f"File exceeds maximum size of {MAX_FILE_SIZE // (1024 * 1024)}MB"})
+        if generate_quiz_slots.saturated():
+            overloaded = generate_quiz_slots.overloaded()
+            return JSONResponse(
+                status_code=overloaded.status_code,
+                content={"detail": overloaded.detail},
+                headers=overloaded.headers
+            )
+    return await call_next(request)
+
 # Configure CORS for specific origins
 allowed_origins = [
     "http://localhost",
@@ -25,13 +68,39 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["Content-Length", "Content-Type"],
+    expose_headers=["Content-Length", "Content-Type", "Retry-After"],
     max_age=600
 )
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+MAX_FORM_FILE_SIZE = 20 * 1024 * 1024  # 20MB
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+# Serialized shard bytes per batch commit, under Firestore's 10MiB request limit
+SHARD_COMMIT_BYTES = 8 * 1024 * 1024
+# Admission control: in-flight limits, queue depth and per-user token buckets (tokens/second, burst)
+GENERATE_QUIZ_CONCURRENCY = 4
+GENERATE_QUIZ_QUEUE = 8
+GENERATE_QUIZ_QUEUE_TIMEOUT = 30  # seconds
+GENERATE_QUIZ_RATE = 1 / 30
+GENERATE_QUIZ_BURST = 3
+SUBMIT_CONCURRENCY = 64
+SUBMIT_QUEUE = 128
+SUBMIT_QUEUE_TIMEOUT = 5  # seconds
+SUBMIT_RATE = 1
+SUBMIT_BURST = 5
+# Optional SQLite file to share rate limit state between workers on the same host
+RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB")
+# Local directory for compressed Parquet snapshots of each form's submissions
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(os.getcwd(), "snapshots"))
+SNAPSHOT_INTERVAL = 15 * 60  # seconds
+# SQLite file holding the lease that lets only one worker on the host write snapshots
+SNAPSHOT_LEASE_DB = os.getenv("SNAPSHOT_LEASE_DB", os.path.join(SNAPSHOT_DIR, "snapshot_lease.db"))
 # Firestore Collections
 FORMS_COLLECTION = "forms"
 SUBMISSIONS_COLLECTION = "submissions"
+QUESTION_SHARDS_COLLECTION = "question_shards"
+ANALYTICS_COLLECTION = "form_analytics"
+ANALYTICS_COUNTERS_COLLECTION = "counters"
+ANALYTICS_SHARDS_COLLECTION = "shards"
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     try:
@@ -40,13 +109,18 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except Exception as e:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
 
-# Models
-class Question(BaseModel):
-    question: str
-    options: List[str]
-    correct_answer: str
-    marks: float
+generate_quiz_slots = ConcurrencyLimiter(GENERATE_QUIZ_CONCURRENCY, GENERATE_QUIZ_QUEUE, GENERATE_QUIZ_QUEUE_TIMEOUT)
+submit_slots = ConcurrencyLimiter(SUBMIT_CONCURRENCY, SUBMIT_QUEUE, SUBMIT_QUEUE_TIMEOUT)
+# PDF parsing and LLM calls get their own threads, so a saturated /generate-quiz can't occupy
+# the default pool that Firestore calls from /form and /submit run on
+generate_quiz_executor = ThreadPoolExecutor(max_workers=GENERATE_QUIZ_CONCURRENCY, thread_name_prefix="generate-quiz")
+generate_quiz_rate_limiter = make_rate_limiter("generate-quiz", GENERATE_QUIZ_RATE, GENERATE_QUIZ_BURST, RATE_LIMIT_DB)
+submit_rate_limiter = make_rate_limiter("submit", SUBMIT_RATE, SUBMIT_BURST, RATE_LIMIT_DB)
+
+async def generate_quiz_rate_limit(user: dict = Depends(get_current_user)):
+    await enforce_rate_limit(generate_quiz_rate_limiter, user['email'])
 
+# Models
 class FormDefinition(BaseModel):
     form_name: str
     questions: List[Question]
@@ -99,6 +173,265 @@ def get_form_ref(form_name: str):
 def get_submissions_ref():
     return db.collection(SUBMISSIONS_COLLECTION)
 
+def get_question_shards_ref(form_ref):
+    return form_ref.collection(QUESTION_SHARDS_COLLECTION)
+
+def get_question_shard_ref(form_ref, shard_idx: int):
+    return get_question_shards_ref(form_ref).document(f"{shard_idx:05d}")
+
+def load_form_questions(form_ref, form_data: dict) -> List[dict]:
+    """Return the form's questions, reassembling them from shard documents if the form is sharded"""
+    if not form_data.get("question_shards"):
+        return form_data.get("questions", [])
+
+    # Only read the shards this form wrote, leftovers from a failed upload under the same name are ignored
+    refs = [get_question_shard_ref(form_ref, idx) for idx in range(form_data["question_shards"])]
+    shards = {shard.id: shard.to_dict() for shard in db.get_all(refs)}
+    questions = []
+    for ref in refs:
+        questions.extend(shards[ref.id]["questions"])
+    return questions
+
+def save_form(form_ref, form_doc: dict, questions: List[dict]):
+    """Store a form, splitting question banks too large for one document into shard documents"""
+    shards = split_question_shards(questions)
+    # New forms start with empty analytics so their tallies never need a backfill
+    analytics_ref = get_analytics_ref(form_ref.id)
+    if len(shards) <= 1:
+        batch = db.batch()
+        batch.set(form_ref, {**form_doc, "questions": questions})
+        batch.set(analytics_ref, {"tracked": True})
+        batch.commit()
+        return
+
+    batch, batch_bytes = db.batch(), 0
+    for shard_idx, (shard, shard_bytes) in enumerate(shards):
+        if batch_bytes and batch_bytes + shard_bytes > SHARD_COMMIT_BYTES:
+            batch.commit()
+            batch, batch_bytes = db.batch(), 0
+        batch.set(get_question_shard_ref(form_ref, shard_idx), {
+            "index": shard_idx,
+            "questions": shard
+        })
+        batch_bytes += shard_bytes
+
+    # Write the form document last so the form only becomes visible once all shards exist
+    batch.set(form_ref, {
+        **form_doc,
+        "questions": [],
+        "question_count": len(questions),
+        "question_shards": len(shards)
+    })
+    batch.set(analytics_ref, {"tracked": True})
+    batch.commit()
+
+def get_analytics_ref(form_name: str):
+    return db.collection(ANALYTICS_COLLECTION).document(form_name)
+
+def get_analytics_counter_ref(form_name: str, slot: int):
+    return get_analytics_ref(form_name).collection(ANALYTICS_COUNTERS_COLLECTION).document(f"{slot:02d}")
+
+def get_analytics_tally_ref(form_name: str, slot: int, shard_idx: int):
+    return get_analytics_ref(form_name).collection(ANALYTICS_SHARDS_COLLECTION).document(f"{slot:02d}-{shard_idx:05d}")
+
+def get_analytics_slot_refs(form_name: str, questions: List[dict]) -> tuple:
+    """Every counter and tally document a form's submissions may have incremented"""
+    counter_refs = [get_analytics_counter_ref(form_name, slot) for slot in range(ANALYTICS_COUNTER_SLOTS)]
+    tally_refs = [
+        get_analytics_tally_ref(form_name, slot, shard_idx)
+        for slot in range(ANALYTICS_COUNTER_SLOTS)
+        for shard_idx in range(analytics_shard_count(questions))
+    ]
+    return counter_refs, tally_refs
+
+def as_increments(counts: dict) -> dict:
+    return {
+        key: as_increments(value) if isinstance(value, dict) else firestore.Increment(value)
+        for key, value in counts.items()
+    }
+
+def add_analytics_writes(batch, form_name: str, questions: List[dict], answers: Dict[str, str], total_marks: float):
+    """Add one graded submission's tally increments to a batch, on a randomly chosen counter slot"""
+    slot = random.randrange(ANALYTICS_COUNTER_SLOTS)
+    totals, per_question = submission_tallies(questions, answers, total_marks)
+    batch.set(get_analytics_counter_ref(form_name, slot), as_increments(totals), merge=True)
+    for shard_idx, tallies in split_by_shard(per_question).items():
+        batch.set(
+            get_analytics_tally_ref(form_name, slot, shard_idx),
+            {"questions": as_increments(tallies)},
+            merge=True
+        )
+
+def count_form_submissions(form_name: str) -> int:
+    counter_refs, _ = get_analytics_slot_refs(form_name, [])
+    return sum(doc.to_dict().get("submissions", 0) for doc in db.get_all(counter_refs) if doc.exists)
+
+def load_form_analytics(form_name: str, questions: List[dict]) -> dict:
+    """Add up a form's counter slots and tally shards"""
+    analytics = get_analytics_ref(form_name).get()
+    stats = {
+        "tracked": analytics.exists and analytics.to_dict().get("tracked", False),
+        "submissions": 0,
+        "total_marks": 0.0,
+        "total_marks_sq": 0.0,
+        "questions": {}
+    }
+    counter_refs, tally_refs = get_analytics_slot_refs(form_name, questions)
+    for doc in db.get_all(counter_refs):
+        if doc.exists:
+            add_counts(stats, doc.to_dict())
+    for doc in db.get_all(tally_refs):
+        if doc.exists:
+            add_counts(stats["questions"], doc.to_dict().get("questions", {}))
+    return stats
+
+@firestore.transactional
+def rebuild_form_analytics(transaction, form_name: str, questions: List[dict]):
+    """Recount analytics from stored submissions, used once for forms created before tallies existed"""
+    analytics_ref = get_analytics_ref(form_name)
+    analytics = analytics_ref.get(transaction=transaction)
+    if analytics.exists and analytics.to_dict().get("tracked"):
+        return
+
+    # Submissions increment these documents, so reading them here makes concurrent submits conflict with the rebuild
+    counter_refs, tally_refs = get_analytics_slot_refs(form_name, questions)
+    list(transaction.get_all(counter_refs + tally_refs))
+    query = get_submissions_ref().where(filter=FieldFilter("form_name", "==", form_name))
+    totals, per_question = tally_submissions(questions, (doc.to_dict() for doc in transaction.get(query)))
+
+    # Store the recount in slot 0 and clear every other slot
+    writes = {get_analytics_counter_ref(form_name, 0).path: (get_analytics_counter_ref(form_name, 0), totals)}
+    for shard_idx, tallies in split_by_shard(per_question).items():
+        ref = get_analytics_tally_ref(form_name, 0, shard_idx)
+        writes[ref.path] = (ref, {"questions": tallies})
+    for ref in counter_refs + tally_refs:
+        if ref.path not in writes:
+            transaction.delete(ref)
+    for ref, data in writes.values():
+        transaction.set(ref, data)
+    transaction.set(analytics_ref, {"tracked": True}, merge=True)
+
+def get_snapshot_path(form_name: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, f"{form_name}.parquet")
+
+def write_submissions_snapshot(form_name: str, questions: List[dict]) -> str:
+    """Write a form's submissions to a zstd-compressed Parquet file with one column per question"""
+    answer_columns = [f"q{idx}" for idx in range(len(questions))]
+    rows = []
+    docs = get_submissions_ref()\
+        .where(filter=FieldFilter("form_name", "==", form_name))\
+        .stream()
+
+    for doc in docs:
+        sub = doc.to_dict()
+        submitted_at = sub.get("submitted_at")
+        # Convert timezone-aware datetimes to naive UTC
+        if isinstance(submitted_at, dt.datetime) and submitted_at.tzinfo is not None:
+            submitted_at = submitted_at.astimezone(dt.timezone.utc).replace(tzinfo=None)
+        row = {
+            "id": doc.id,
+            "user_name": sub.get("user_name"),
+            "user_email": sub.get("user_email"),
+            "total_marks": sub.get("total_marks", 0),
+            "submitted_at": submitted_at
+        }
+        answers = sub.get("answers", {})
+        for idx, column in enumerate(answer_columns):
+            row[column] = answers.get(str(idx))
+        rows.append(row)
+
+    df = pd.DataFrame(rows, columns=["id", "user_name", "user_email", "total_marks", "submitted_at"] + answer_columns)
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    path = get_snapshot_path(form_name)
+    # Write to a unique temporary file first so readers never see a partial snapshot
+    fd, tmp_path = tempfile.mkstemp(dir=SNAPSHOT_DIR, suffix=".parquet.tmp")
+    os.close(fd)
+    try:
+        df.to_parquet(tmp_path, engine="pyarrow", compression="zstd", index=False)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    return path
+
+def snapshot_stale_forms():
+    """Refresh the Parquet snapshot of every form that received submissions since its last snapshot"""
+    for doc in db.collection(ANALYTICS_COLLECTION).stream():
+        # One failing form, e.g. deleted mid-pass, must not stop the snapshots of the others
+        try:
+            snapshot_form_if_stale(doc)
+        except Exception:
+            logger.exception("Submission snapshot failed for form %s", doc.id)
+
+def snapshot_form_if_stale(doc):
+    submissions = count_form_submissions(doc.id)
+    if submissions == doc.to_dict().get("snapshot_submissions"):
+        return
+
+    form_ref = get_form_ref(doc.id)
+    form = form_ref.get()
+    if not form.exists:
+        return
+    write_submissions_snapshot(doc.id, load_form_questions(form_ref, form.to_dict()))
+    doc.reference.update({"snapshot_submissions": submissions})
+
+class SQLiteLease:
+    """Expiring lease in a local SQLite file so only one worker on the host runs a periodic job"""
+    def __init__(self, path: str, name: str):
+        self.name = name
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex}"
+        self.conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT, expires REAL)"
+        )
+
+    def acquire(self, ttl: float) -> bool:
+        """Take or renew the lease, returning False while another worker holds it"""
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(
+                "SELECT owner, expires FROM leases WHERE name = ?", (self.name,)
+            ).fetchone()
+            held = row is None or row[0] == self.owner or row[1] < now
+            if held:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO leases VALUES (?, ?, ?)",
+                    (self.name, self.owner, now + ttl)
+                )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return held
+
+def run_snapshot_job(snapshot_lease: SQLiteLease):
+    # Only the worker holding the lease writes snapshots, the others skip this interval
+    if not snapshot_lease.acquire(SNAPSHOT_INTERVAL * 2):
+        return
+    snapshot_stale_forms()
+
+async def snapshot_loop(snapshot_lease: SQLiteLease):
+    while True:
+        await asyncio.sleep(SNAPSHOT_INTERVAL)
+        try:
+            await asyncio.to_thread(run_snapshot_job, snapshot_lease)
+        except Exception:
+            logger.exception("Submission snapshot failed")
+
+async def read_upload(file: UploadFile, max_size: int) -> bytearray:
+    """Read an upload in chunks, rejecting it as soon as it exceeds max_size"""
+    limit_mb = max_size // (1024 * 1024)
+    if file.size is not None and file.size > max_size:
+        raise HTTPException(413, f"File exceeds maximum size of {limit_mb}MB")
+
+    contents = bytearray()
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        contents.extend(chunk)
+        if len(contents) > max_size:
+            raise HTTPException(413, f"File exceeds maximum size of {limit_mb}MB")
+    return contents
+
 @app.post("/upload-form")
 async def upload_form(
     file: UploadFile = File(...),
@@ -108,37 +441,27 @@ async def upload_form(
     user: dict = Depends(get_current_user)
 ):
     try:
-        contents = await file.read()
-        form_data = json.loads(contents)
-        
         form_ref = get_form_ref(form_name)
         if form_ref.get().exists:
             raise HTTPException(status_code=400, detail="Form name already exists")
 
-        questions = []
-        for q in form_data.get("questions", []):
-            question = Question(
-                question=q.get("question"),
-                options=q.get("options", []),
-                correct_answer=q.get("correct_answer"),
-                marks=q.get("marks", 0)
-            )
-            if question.correct_answer not in question.options:
-                raise ValueError(f"Correct answer '{question.correct_answer}' not in options")
-            questions.append(question.dict())
+        contents = await read_upload(file, MAX_FORM_FILE_SIZE)
+        # Parsing, validation and the shard commits are CPU and blocking I/O, keep them off the event loop
+        questions = await asyncio.to_thread(parse_uploaded_form, contents)
         
-        form_ref.set({
+        await asyncio.to_thread(save_form, form_ref, {
             "form_name": form_name,
-            "questions": questions,
             "protected": protected,
             "show_answers": show_answers,
             "created_at": datetime.now(),
             "creator_email": user['email']
-        })
+        }, questions)
         
         return {"message": "Form saved successfully", "form_name": form_name}
 
-    except json.JSONDecodeError:
+    except HTTPException:
+        raise
+    except orjson.JSONDecodeError:
         raise HTTPException(400, "Invalid JSON format")
     except ValueError as e:
         raise HTTPException(400, str(e))
@@ -157,14 +480,13 @@ async def create_form(form_data: FormCreateRequest, user: dict = Depends(get_cur
             raise HTTPException(400, "Correct answer must be in options")
         questions.append(q.dict())
 
-    form_ref.set({
+    await asyncio.to_thread(save_form, form_ref, {
         "form_name": form_data.form_name,
-        "questions": questions,
         "protected": form_data.protected,
         "show_answers": form_data.show_answers,
         "created_at": datetime.now(),
         "creator_email": user['email']
-    })
+    }, questions)
     
     return {"message": "Form created", "form_name": form_data.form_name}
 
@@ -218,6 +540,24 @@ async def export_submissions(form_name: str, user: dict = Depends(get_current_us
     headers = {'Content-Disposition': f'attachment; filename="{form_name}_submissions.xlsx"'}
     return Response(output.getvalue(), headers=headers, media_type="application/vnd.ms-excel")
 
+@app.get("/forms/{form_name}/analytics")
+async def get_form_analytics(form_name: str, user: dict = Depends(get_current_user)):
+    form_ref = get_form_ref(form_name)
+    form = form_ref.get().to_dict()
+    
+    if not form or form['creator_email'] != user['email']:
+        raise HTTPException(403, "Access denied")
+    
+    questions = load_form_questions(form_ref, form)
+    stats = load_form_analytics(form_name, questions)
+    
+    # Forms created before analytics tracking have no complete tallies yet
+    if not stats.get("tracked"):
+        await asyncio.to_thread(rebuild_form_analytics, db.transaction(), form_name, questions)
+        stats = load_form_analytics(form_name, questions)
+    
+    return summarize_analytics(questions, stats)
+
 @app.get("/my-forms")
 async def get_user_forms(user: dict = Depends(get_current_user)):
     forms = []
@@ -243,29 +583,29 @@ async def get_user_submissions(user: dict = Depends(get_current_user)):
         form_ref = get_form_ref(sub['form_name'])
         form = form_ref.get().to_dict()
         
-        total_possible = sum(q['marks'] for q in form['questions'])
+        total_possible = sum(q['marks'] for q in load_form_questions(form_ref, form))
         sub['total_possible_marks'] = total_possible
         sub['id'] = doc.id
         submissions.append(sub)
     
     return submissions
 
-@app.get("/form/{form_name}")
-async def get_form(form_name: str):
+def read_form(form_name: str) -> dict:
     form_ref = get_form_ref(form_name)
     form = form_ref.get()
     if not form.exists:
         raise HTTPException(404, "Form not found")
-    return form.to_dict()
+    form_data = form.to_dict()
+    form_data["questions"] = load_form_questions(form_ref, form_data)
+    return form_data
+
+@app.get("/form/{form_name}")
+async def get_form(form_name: str):
+    return await asyncio.to_thread(read_form, form_name)
 
 @app.get("/form/{form_name}")
 async def get_form(form_name: str, credentials: HTTPAuthorizationCredentials = Depends(security)):
-    form_ref = get_form_ref(form_name)
-    form = form_ref.get()
-    if not form.exists:
-        raise HTTPException(404, "Form not found")
-    
-    form_data = form.to_dict()
+    form_data = await asyncio.to_thread(read_form, form_name)
     
     # # Check if form is protected
     # if form_data.get("protected", False):
@@ -304,13 +644,32 @@ async def delete_form(form_name: str):
     batch = db.batch()
     for sub in submissions:
         batch.delete(sub.reference)
+    for shard in get_question_shards_ref(form_ref).stream():
+        batch.delete(shard.reference)
+    for collection in (ANALYTICS_COUNTERS_COLLECTION, ANALYTICS_SHARDS_COLLECTION):
+        for slot in get_analytics_ref(form_name).collection(collection).stream():
+            batch.delete(slot.reference)
+    batch.delete(get_analytics_ref(form_name))
     batch.commit()
     
     form_ref.delete()
+    if os.path.exists(get_snapshot_path(form_name)):
+        os.remove(get_snapshot_path(form_name))
     return {"message": "Form and related submissions deleted successfully"}
 
-@app.post("/submit")
+@app.post("/submit", dependencies=[Depends(submit_slots)])
 async def submit_form(submission: FormSubmission):
+    await enforce_rate_limit(submit_rate_limiter, submission.user_email)
+    # Firestore calls block, run them in a thread so the slot is held while other requests keep flowing
+    total_marks = await asyncio.to_thread(store_submission, submission)
+    
+    return {
+        "message": "Submission saved",
+        "total_marks": total_marks
+    }
+
+def store_submission(submission: FormSubmission) -> float:
+    """Grade a submission and store it with its analytics tallies, returning the marks awarded"""
     form_ref = get_form_ref(submission.form_name)
     form = form_ref.get()
     if not form.exists:
@@ -329,7 +688,8 @@ async def submit_form(submission: FormSubmission):
         raise HTTPException(400, "You have already submitted this form")
     
     # Calculate marks
-    for idx, question in enumerate(form_data['questions']):
+    questions = load_form_questions(form_ref, form_data)
+    for idx, question in enumerate(questions):
         user_answer = submission.answers.get(str(idx))
         if user_answer == question['correct_answer']:
             total_marks += question['marks']
@@ -339,27 +699,33 @@ async def submit_form(submission: FormSubmission):
     sub_data['total_marks'] = total_marks
     sub_data['submitted_at'] = datetime.now()
     
-    get_submissions_ref().add(sub_data)
-    
-    return {
-        "message": "Submission saved",
-        "total_marks": total_marks
-    }
+    # Store the submission and update the form's analytics tallies atomically
+    batch = db.batch()
+    batch.set(get_submissions_ref().document(), sub_data)
+    add_analytics_writes(batch, submission.form_name, questions, submission.answers, total_marks)
+    batch.commit()
+    return total_marks
     
+def pdf_bytes_to_text(contents: bytes) -> str:
+    # Use BytesIO to create a file-like object
+    with pdfplumber.open(BytesIO(contents)) as pdf:
+        text = ""
+        for page in pdf.pages:
+            page_text = page.extract_text()
+            if page_text:
+                text += page_text + "\n"
+        return text
+
 async def extract_text_from_pdf(file: UploadFile) -> str:
     """Extract text from PDF using pdfplumber"""
     try:
         # Read the uploaded file content
         contents = await file.read()
         
-        # Use BytesIO to create a file-like object
-        with pdfplumber.open(BytesIO(contents)) as pdf:
-            text = ""
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-            return text
+        # Parse off the event loop so other requests keep being served
+        return await asyncio.get_running_loop().run_in_executor(
+            generate_quiz_executor, pdf_bytes_to_text, contents
+        )
             
     except Exception as e:
         raise HTTPException(
@@ -411,9 +777,14 @@ async def generate_quiz_with_together(pdf_text: str) -> Dict:
     """
 
     try:
-        response = client.chat.completions.create(
-            model="meta-llama/Llama-3.3-70B-Instruct-Turbo",
-            messages=[{"role": "user", "content": prompt}],
+        # The Together client is synchronous, run it in a thread to avoid blocking the event loop
+        response = await asyncio.get_running_loop().run_in_executor(
+            generate_quiz_executor,
+            partial(
+                client.chat.completions.create,
+                model="meta-llama/Llama-3.3-70B-Instruct-Turbo",
+                messages=[{"role": "user", "content": prompt}],
+            )
         )
         content = response.choices[0].message.content
         quiz_data = extract_json_from_response(content)
@@ -434,7 +805,13 @@ async def generate_quiz_with_together(pdf_text: str) -> Dict:
             detail=f"Together API error: {str(e)}"
         )
 
-@app.post("/generate-quiz", response_model=QuizResponse)
+@app.post(
+    "/generate-quiz",
+    response_model=QuizResponse,
+    # Authenticate before queueing so anonymous clients can't hold slots, and take a slot
+    # before a token so requests shed with 503 don't use up the creator's burst
+    dependencies=[Depends(get_current_user), Depends(generate_quiz_slots), Depends(generate_quiz_rate_limit)]
+)
 async def create_quiz_from_pdf(
     file: UploadFile = File(..., max_size=MAX_FILE_SIZE),
     form_name: str = Form(...),
@@ -483,14 +860,13 @@ async def create_quiz_from_pdf(
                 raise HTTPException(400, "Correct answer must be in options")
 
         # Create form in Firestore
-        form_ref.set({
+        await asyncio.to_thread(save_form, form_ref, {
             "form_name": form_name,
-            "questions": [q.dict() for q in form_request.questions],
             "protected": protected,
             "show_answers": show_answers,
             "created_at": datetime.now(),
             "creator_email": user['email']
-        })
+        }, [q.dict() for q in form_request.questions])
 
         return {
             "success": True,
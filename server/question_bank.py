@@ -0,0 +1,71 @@
+from typing import List, Tuple
+import orjson
+from fastapi import HTTPException
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+# Questions validated per pydantic batch
+VALIDATION_BATCH_SIZE = 500
+# Serialized question bytes per form or shard document, under Firestore's 1MiB document limit
+QUESTION_SHARD_BYTES = 900 * 1024
+
+class Question(BaseModel):
+    question: str
+    options: List[str]
+    correct_answer: str
+    marks: float
+
+class UploadedQuestion(Question):
+    options: List[str] = []
+    marks: float = 0
+
+uploaded_questions_adapter = TypeAdapter(List[UploadedQuestion])
+
+def validate_uploaded_questions(raw_questions) -> List[dict]:
+    """Validate uploaded questions batch by batch, reporting the index of the first invalid question"""
+    if not isinstance(raw_questions, list):
+        raise ValueError("'questions' must be a list")
+
+    questions = []
+    for start in range(0, len(raw_questions), VALIDATION_BATCH_SIZE):
+        try:
+            batch = uploaded_questions_adapter.validate_python(
+                raw_questions[start:start + VALIDATION_BATCH_SIZE]
+            )
+        except ValidationError as e:
+            error = e.errors()[0]
+            idx = start + error["loc"][0]
+            field = ".".join(str(part) for part in error["loc"][1:])
+            location = f"Question {idx}" + (f" ({field})" if field else "")
+            raise ValueError(f"{location}: {error['msg']}")
+
+        for offset, question in enumerate(batch):
+            if question.correct_answer not in question.options:
+                raise ValueError(
+                    f"Question {start + offset}: correct answer '{question.correct_answer}' not in options"
+                )
+            questions.append(question.model_dump())
+    return questions
+
+def parse_uploaded_form(contents: bytearray) -> List[dict]:
+    """Parse an uploaded form file and return its validated questions"""
+    form_data = orjson.loads(contents)
+    if not isinstance(form_data, dict):
+        raise ValueError("Form file must be a JSON object with a 'questions' list")
+    return validate_uploaded_questions(form_data.get("questions", []))
+
+def split_question_shards(questions: List[dict]) -> List[Tuple[List[dict], int]]:
+    """Group questions into (shard, serialized bytes) pairs that stay within QUESTION_SHARD_BYTES"""
+    shards = []
+    current, current_bytes = [], 0
+    for idx, question in enumerate(questions):
+        size = len(orjson.dumps(question))
+        if size > QUESTION_SHARD_BYTES:
+            raise HTTPException(413, f"Question {idx} exceeds the maximum stored question size")
+        if current and current_bytes + size > QUESTION_SHARD_BYTES:
+            shards.append((current, current_bytes))
+            current, current_bytes = [], 0
+        current.append(question)
+        current_bytes += size
+    if current:
+        shards.append((current, current_bytes))
+    return shards
@@ -0,0 +1,132 @@
+import asyncio
+import sqlite3
+import time
+import pytest
+from fastapi import HTTPException
+from admission import (
+    ConcurrencyLimiter,
+    SQLiteTokenBucketLimiter,
+    TokenBucketLimiter,
+    enforce_rate_limit,
+)
+
+def test_take_refills_and_reports_wait():
+    limiter = TokenBucketLimiter(rate=2, capacity=3)
+    assert limiter.take(3, 0, 0) == (2, 0.0)
+    # Half a second at 2 tokens/s refills one token
+    assert limiter.take(0, 0, 0.5) == (0, 0.0)
+    tokens, wait = limiter.take(0.5, 0, 0)
+    assert tokens == 0.5
+    assert wait == pytest.approx(0.25)
+    # Refill never exceeds capacity
+    assert limiter.take(3, 0, 100) == (2, 0.0)
+
+def test_acquire_allows_burst_then_limits():
+    limiter = TokenBucketLimiter(rate=1, capacity=3)
+    assert [limiter.acquire("a") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.acquire("a") > 0
+    # Other users keep their own bucket
+    assert limiter.acquire("b") == 0.0
+
+def test_sqlite_limiter_shares_state_and_prunes(tmp_path, monkeypatch):
+    path = str(tmp_path / "limits.db")
+    first = SQLiteTokenBucketLimiter(rate=1, capacity=2, path=path, name="submit")
+    second = SQLiteTokenBucketLimiter(rate=1, capacity=2, path=path, name="submit")
+    assert first.acquire("a") == 0.0
+    assert second.acquire("a") == 0.0
+    assert first.acquire("a") > 0
+
+    monkeypatch.setattr("admission.RATE_LIMIT_PRUNE_EVERY", 1)
+    # Jump past the point where "a" has refilled completely
+    later = time.time() + 60
+    monkeypatch.setattr(time, "time", lambda: later)
+    second.acquire("b")
+    keys = [row[0] for row in second.conn.execute("SELECT key FROM rate_limits")]
+    assert keys == ["b"]
+
+def test_enforce_rate_limit_sets_retry_after():
+    limiter = TokenBucketLimiter(rate=0.1, capacity=1)
+    asyncio.run(enforce_rate_limit(limiter, "a"))
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(enforce_rate_limit(limiter, "a"))
+    assert exc.value.status_code == 429
+    assert exc.value.headers["Retry-After"] == "10"
+
+def test_concurrency_limiter_queues_then_times_out():
+    async def run():
+        limiter = ConcurrencyLimiter(limit=1, max_queue=1, queue_timeout=0.05)
+        held = limiter()
+        await held.__anext__()
+        with pytest.raises(HTTPException) as exc:
+            await limiter().__anext__()
+        assert exc.value.status_code == 503
+        assert exc.value.headers["Retry-After"] == "1"
+        assert limiter.waiting == 0
+        await held.aclose()
+        # The slot is free again once the holder finishes
+        await limiter().__anext__()
+    asyncio.run(run())
+
+def test_concurrency_limiter_sheds_when_queue_full():
+    async def run():
+        limiter = ConcurrencyLimiter(limit=1, max_queue=1, queue_timeout=1)
+        held = limiter()
+        await held.__anext__()
+        queued = asyncio.create_task(limiter().__anext__())
+        await asyncio.sleep(0)
+        assert limiter.waiting == 1
+
+        start = time.monotonic()
+        with pytest.raises(HTTPException) as exc:
+            await limiter().__anext__()
+        assert exc.value.status_code == 503
+        assert time.monotonic() - start < 0.5
+
+        await held.aclose()
+        await queued
+    asyncio.run(run())
+
+def test_acquire_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr("admission.RATE_LIMIT_MAX_KEYS", 3)
+    limiter = TokenBucketLimiter(rate=0.001, capacity=1)
+    for key in ["a", "b", "c"]:
+        limiter.acquire(key)
+    # Touching "a" makes "b" the least recently used
+    limiter.acquire("a")
+    limiter.acquire("d")
+    assert list(limiter.buckets) == ["c", "a", "d"]
+
+def test_acquire_drops_refilled_buckets(monkeypatch):
+    limiter = TokenBucketLimiter(rate=1, capacity=2)
+    limiter.acquire("a")
+    limiter.acquire("b")
+    # Jump past the point where both buckets have refilled completely
+    later = time.monotonic() + 60
+    monkeypatch.setattr(time, "monotonic", lambda: later)
+    limiter.acquire("c")
+    assert list(limiter.buckets) == ["c"]
+
+def test_enforce_rate_limit_sheds_when_sqlite_is_locked(tmp_path, monkeypatch):
+    limiter = SQLiteTokenBucketLimiter(rate=1, capacity=2, path=str(tmp_path / "limits.db"), name="submit")
+
+    def locked(key):
+        raise sqlite3.OperationalError("database is locked")
+    monkeypatch.setattr(limiter, "acquire", locked)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(enforce_rate_limit(limiter, "a"))
+    assert exc.value.status_code == 503
+    assert exc.value.headers["Retry-After"] == "1"
+
+def test_concurrency_limiter_reports_saturation():
+    async def run():
+        limiter = ConcurrencyLimiter(limit=1, max_queue=1, queue_timeout=1)
+        held = limiter()
+        await held.__anext__()
+        assert not limiter.saturated()
+        queued = asyncio.create_task(limiter().__anext__())
+        await asyncio.sleep(0)
+        assert limiter.saturated()
+        await held.aclose()
+        await queued
+        assert not limiter.saturated()
+    asyncio.run(run())
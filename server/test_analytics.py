@@ -0,0 +1,109 @@
+import statistics
+import pytest
+from analytics import (
+    ANALYTICS_SHARD_SIZE,
+    add_counts,
+    answer_option_key,
+    split_by_shard,
+    submission_tallies,
+    summarize_analytics,
+    tally_submissions,
+)
+
+QUESTIONS = [
+    {"question": "Q0", "options": ["a", "b", "c"], "correct_answer": "a", "marks": 1},
+    {"question": "Q1", "options": ["x", "y"], "correct_answer": "y", "marks": 2},
+]
+
+def test_answer_option_key():
+    question = QUESTIONS[0]
+    assert answer_option_key(question, "b") == "1"
+    assert answer_option_key(question, None) == "unanswered"
+    assert answer_option_key(question, "") == "unanswered"
+    assert answer_option_key(question, "z") == "other"
+
+def test_submission_tallies():
+    totals, per_question = submission_tallies(QUESTIONS, {"0": "a", "1": "z"}, 1.0)
+    assert totals == {"submissions": 1, "total_marks": 1.0, "total_marks_sq": 1.0}
+    assert per_question == {
+        "0": {"options": {"0": 1}, "correct": 1, "correct_total_marks": 1.0},
+        "1": {"options": {"other": 1}, "correct": 0, "correct_total_marks": 0},
+    }
+
+def test_add_counts_merges_nested():
+    target = {"a": 1, "nested": {"x": 1}}
+    add_counts(target, {"a": 2, "nested": {"x": 1, "y": 3}, "b": 1})
+    assert target == {"a": 3, "nested": {"x": 2, "y": 3}, "b": 1}
+
+def test_split_by_shard_boundary():
+    questions = [QUESTIONS[0]] * (2 * ANALYTICS_SHARD_SIZE + 50)
+    _, per_question = submission_tallies(questions, {}, 0)
+    shards = split_by_shard(per_question)
+    assert sorted(shards) == [0, 1, 2]
+    assert [len(shards[idx]) for idx in range(3)] == [ANALYTICS_SHARD_SIZE, ANALYTICS_SHARD_SIZE, 50]
+    assert str(ANALYTICS_SHARD_SIZE - 1) in shards[0]
+    assert str(ANALYTICS_SHARD_SIZE) in shards[1]
+
+def test_tally_submissions_matches_incremental_tallies():
+    submissions = [
+        {"answers": {"0": "a", "1": "y"}, "total_marks": 3},
+        {"answers": {"0": "b"}, "total_marks": 0},
+        {"answers": {"0": "a", "1": "x"}, "total_marks": 1},
+    ]
+    totals, per_question = tally_submissions(QUESTIONS, submissions)
+
+    incremental_totals, incremental_questions = {}, {}
+    for sub in submissions:
+        sub_totals, sub_questions = submission_tallies(QUESTIONS, sub["answers"], sub["total_marks"])
+        add_counts(incremental_totals, sub_totals)
+        add_counts(incremental_questions, sub_questions)
+    assert totals == incremental_totals
+    assert per_question == incremental_questions
+    assert totals == {"submissions": 3, "total_marks": 4, "total_marks_sq": 10}
+    assert per_question["1"]["options"] == {"1": 1, "unanswered": 1, "0": 1}
+
+def test_summarize_without_submissions():
+    summary = summarize_analytics(QUESTIONS, {})
+    assert summary["submissions"] == 0
+    assert summary["average_marks"] == 0
+    assert summary["questions"][0]["difficulty"] is None
+    assert summary["questions"][0]["discrimination"] is None
+    assert summary["questions"][0]["options"] == [
+        {"option": "a", "count": 0}, {"option": "b", "count": 0}, {"option": "c", "count": 0}
+    ]
+
+def test_summarize_matches_point_biserial_correlation():
+    submissions = [
+        {"answers": {"0": "a", "1": "y"}, "total_marks": 3},
+        {"answers": {"0": "a", "1": "x"}, "total_marks": 1},
+        {"answers": {"0": "b", "1": "y"}, "total_marks": 2},
+        {"answers": {"0": "c"}, "total_marks": 0},
+        {"answers": {"0": "z", "1": "y"}, "total_marks": 2},
+    ]
+    totals, per_question = tally_submissions(QUESTIONS, submissions)
+    summary = summarize_analytics(QUESTIONS, {**totals, "questions": per_question})
+
+    marks = [sub["total_marks"] for sub in submissions]
+    assert summary["submissions"] == 5
+    assert summary["average_marks"] == 1.6
+    for idx, question in enumerate(QUESTIONS):
+        correct = [int(sub["answers"].get(str(idx)) == question["correct_answer"]) for sub in submissions]
+        result = summary["questions"][idx]
+        assert result["difficulty"] == round(sum(correct) / 5 * 100, 2)
+        assert result["discrimination"] == pytest.approx(statistics.correlation(correct, marks), abs=1e-4)
+
+    first = summary["questions"][0]
+    assert [option["count"] for option in first["options"]] == [2, 1, 1]
+    assert first["other"] == 1
+    assert first["unanswered"] == 0
+    assert summary["questions"][1]["unanswered"] == 1
+
+def test_summarize_discrimination_undefined_when_everyone_agrees():
+    submissions = [
+        {"answers": {"0": "a", "1": "x"}, "total_marks": 1},
+        {"answers": {"0": "a", "1": "y"}, "total_marks": 3},
+    ]
+    totals, per_question = tally_submissions(QUESTIONS, submissions)
+    summary = summarize_analytics(QUESTIONS, {**totals, "questions": per_question})
+    assert summary["questions"][0]["difficulty"] == 100
+    assert summary["questions"][0]["discrimination"] is None
@@ -0,0 +1,71 @@
+import orjson
+import pytest
+from fastapi import HTTPException
+import question_bank
+from question_bank import (
+    VALIDATION_BATCH_SIZE,
+    parse_uploaded_form,
+    split_question_shards,
+    validate_uploaded_questions,
+)
+
+def make_question(idx: int) -> dict:
+    return {"question": f"Q{idx}", "options": ["a", "b"], "correct_answer": "a", "marks": 1}
+
+def test_validate_applies_defaults():
+    questions = validate_uploaded_questions([{"question": "Q", "options": ["a"], "correct_answer": "a"}])
+    assert questions == [{"question": "Q", "options": ["a"], "correct_answer": "a", "marks": 0}]
+
+def test_validate_reports_index_past_batch_boundary():
+    raw = [make_question(idx) for idx in range(VALIDATION_BATCH_SIZE + 5)]
+    del raw[VALIDATION_BATCH_SIZE + 1]["question"]
+    with pytest.raises(ValueError, match=rf"^Question {VALIDATION_BATCH_SIZE + 1} \(question\)"):
+        validate_uploaded_questions(raw)
+
+def test_validate_reports_non_object_question():
+    raw = [make_question(0), "not a question"]
+    with pytest.raises(ValueError, match=r"^Question 1:"):
+        validate_uploaded_questions(raw)
+
+def test_validate_rejects_correct_answer_missing_from_options():
+    raw = [make_question(idx) for idx in range(VALIDATION_BATCH_SIZE + 1)]
+    raw[VALIDATION_BATCH_SIZE]["correct_answer"] = "z"
+    with pytest.raises(ValueError, match=rf"^Question {VALIDATION_BATCH_SIZE}: correct answer 'z'"):
+        validate_uploaded_questions(raw)
+
+def test_validate_rejects_non_list():
+    with pytest.raises(ValueError, match="must be a list"):
+        validate_uploaded_questions({"question": "Q"})
+
+def test_parse_rejects_non_object_file():
+    with pytest.raises(ValueError, match="JSON object"):
+        parse_uploaded_form(bytearray(b"[1, 2]"))
+
+def test_parse_rejects_invalid_json():
+    with pytest.raises(orjson.JSONDecodeError):
+        parse_uploaded_form(bytearray(b"{\"questions\": ["))
+
+def test_parse_accepts_bytearray():
+    contents = bytearray(orjson.dumps({"questions": [make_question(0)]}))
+    assert parse_uploaded_form(contents) == [make_question(0)]
+
+def test_split_respects_byte_budget(monkeypatch):
+    questions = [make_question(idx) for idx in range(10)]
+    size = len(orjson.dumps(questions[0]))
+    monkeypatch.setattr(question_bank, "QUESTION_SHARD_BYTES", size * 3)
+    shards = split_question_shards(questions)
+    assert [len(shard) for shard, _ in shards] == [3, 3, 3, 1]
+    assert [shard_bytes for _, shard_bytes in shards] == [size * 3, size * 3, size * 3, size]
+    assert [q for shard, _ in shards for q in shard] == questions
+
+def test_split_small_bank_is_single_shard():
+    questions = [make_question(idx) for idx in range(3)]
+    assert len(split_question_shards(questions)) == 1
+    assert split_question_shards([]) == []
+
+def test_split_rejects_oversized_question(monkeypatch):
+    monkeypatch.setattr(question_bank, "QUESTION_SHARD_BYTES", 10)
+    with pytest.raises(HTTPException) as exc:
+        split_question_shards([make_question(0)])
+    assert exc.value.status_code == 413
+    assert "Question 0" in exc.value.detail